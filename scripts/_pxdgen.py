@@ -19,10 +19,12 @@ import sys
 import os
 import os.path
 import glob
+import multiprocessing
 import clang.cindex
 import pxdgen.utils as utils
 from pxdgen.utils import TabWriter
-from pxdgen.cursors import Namespace, block
+from pxdgen.cursors import CCursor, Namespace, block, clear_cache
+from typing import Iterable, List, Optional, Tuple
 from colorama import Fore, Style, init as colorama_init
 colorama_init()
 
@@ -43,6 +45,14 @@ SEVERITY = {
 }
 
 
+class ParseError(Exception):
+    pass
+
+
+class ClangLoadError(Exception):
+    pass
+
+
 def px_log(*args, source: str = "PxdGen"):
     source = f"[{source}]"
     print(f"{source:.<15}", *args, sep='', file=sys.stderr)
@@ -74,18 +84,10 @@ class PxdGen:
         if program_options.output and not os.path.isdir(program_options.output):
             os.makedirs(program_options.output)
 
-        if program_options.libs:
-            clang.cindex.Config.set_library_path(program_options.libs)
-
         try:
-            self.index = clang.cindex.Index.create()
-        except clang.cindex.LibclangError as e:
-            msg = str(e)
-
-            if "set_library_path" in msg:
-                exit("Unable to find libclang.[so|dylib|dll]. Specify the path to PxdGen with `-L`")
-
-            exit(msg)
+            self._load_clang(program_options.libs)
+        except ClangLoadError as e:
+            exit(str(e))
 
         clang_args = list()
 
@@ -104,6 +106,30 @@ class PxdGen:
         self.relpath = relpath
         self.flags = set(program_options.flags)
 
+    def _load_clang(self, libs: Optional[str]):
+        """
+        Load libclang, create the Clang index and load the
+        PxdGen extensions. Also run by spawned worker processes.
+
+        @param libs: Directory containing libclang, or None for the default search.
+        @return: None.
+        @raise ClangLoadError: If libclang cannot be loaded.
+        """
+        # The library path cannot be set again once libclang is loaded,
+        # as when another PxdGen is created in the same process
+        if libs and not clang.cindex.Config.loaded:
+            clang.cindex.Config.set_library_path(libs)
+
+        try:
+            self.index = clang.cindex.Index.create()
+        except clang.cindex.LibclangError as e:
+            msg = str(e)
+
+            if "set_library_path" in msg:
+                raise ClangLoadError("Unable to find libclang.[so|dylib|dll]. Specify the path to PxdGen with `-L`")
+
+            raise ClangLoadError(msg)
+
         from pxdgen.extensions import load_extensions
         load_extensions()
 
@@ -141,59 +167,117 @@ class PxdGen:
             for w in self.opts.whitelist:
                 valid_headers |= set(os.path.abspath(f) for f in glob.glob(w, recursive=True))
 
-        # Context which contains a mapping of namespace->IOStream
-        # The IOStream has the text for the __init__.pxd of each
-        # namespace
-        ctx = dict()
+        self.valid_headers = frozenset(valid_headers)
+        jobs = min(getattr(self.opts, "jobs", None) or 1, len(to_parse))
+
+        try:
+            if jobs > 1:
+                # Translation units are independent, so each header is parsed and
+                # converted in a worker process. Only the rendered text is sent back,
+                # and imap keeps the output in the same order as a sequential run.
+                with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(self,)) as pool:
+                    self._emit(to_parse, pool.imap(_parse_header, to_parse))
+            else:
+                self._emit(to_parse, map(self.parse, to_parse))
+        except ParseError:
+            exit()
+        except ClangLoadError as e:
+            exit(str(e))
+
+    def parse(self, file: str) -> List[Tuple[str, str]]:
+        """
+        Parse a single header and render the pxd text of each
+        namespace declared in it.
+
+        @param file: Absolute path to the header to parse.
+        @return: List of (namespace name, pxd text) pairs.
+        """
+        valid_headers = self.valid_headers
+        result = list()
         parse_opts = clang.cindex.TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD if FLAG_PARSE_DEFINES in self.flags else 0
+        # Release the previous translation unit before parsing the next
+        clear_cache()
+        tu = self.index.parse(file, self.clang_args, options=parse_opts)
 
-        for file in to_parse:
-            tu = self.index.parse(file, self.clang_args, options=parse_opts)
+        if self.opts.verbose:
+            px_log("Parsing ", file)
 
-            if self.opts.verbose:
-                px_log("Parsing ", file)
+        for d in tu.diagnostics:
+            if d.severity == 0:
+                continue
+            if self.opts.verbose and d.severity < 3:
+                px_log(f"{SEVERITY[d.severity]}: {d.spelling}", source="Clang")
+            elif d.severity >= 3:
+                px_log(f"{SEVERITY[d.severity]}: {d.spelling}", source="Clang")
+                if FLAG_ERROR_EXIT in self.flags:
+                    raise ParseError(d.spelling)
 
-            for d in tu.diagnostics:
-                if d.severity == 0:
-                    continue
-                if self.opts.verbose and d.severity < 3:
-                    px_log(f"{SEVERITY[d.severity]}: {d.spelling}", source="Clang")
-                elif d.severity >= 3:
-                    px_log(f"{SEVERITY[d.severity]}: {d.spelling}", source="Clang")
-                    if FLAG_ERROR_EXIT in self.flags:
-                        exit()
-
-            # Find the namespaces for the current file, and its associated cursors
-            namespaces = utils.find_namespaces(tu.cursor, valid_headers, self.opts.recursive)
-            # The C "top-level" namespace
-            namespaces[''] = [tu.cursor]
-
-            for space_name, cursors in namespaces.items():
-                pxspace = Namespace(cursors, self.opts.recursive, len(self.opts.whitelist) > 0, file, valid_headers)
-
-                if not pxspace.has_declarations:
-                    continue
+        # Find the namespaces for the current file, and its associated cursors
+        namespaces = utils.find_namespaces(tu.cursor, valid_headers, self.opts.recursive)
+        # The C "top-level" namespace
+        namespaces[''] = [tu.cursor]
+        # Sort keys of the forward declarations, shared by the namespaces
+        fwd_keys = dict()
+
+        for space_name, cursors in namespaces.items():
+            pxspace = Namespace(cursors, self.opts.recursive, len(self.opts.whitelist) > 0, file, valid_headers)
 
-                imports, fwd, body = set(), TabWriter(), TabWriter()
+            if not pxspace.has_declarations:
+                continue
 
-                #  Imports are disabled if extra declarations are defined
-                #  Extra declarations are disabled if recursive is enabled
-                #  Imports are also disabled if output is directed to a single file/stream
-                if FLAG_EXTRA_DECLS in self.flags and not self.opts.recursive:
-                    fwd_decls = sorted(pxspace.forward_decls, key=lambda v: len(Namespace._get_all_assoc(v.cursor)))
+            imports, fwd, body = set(), TabWriter(), TabWriter()
 
-                    if len(fwd_decls):
-                        for line in block(fwd_decls, "toplevel", "cdef extern from *:", False):
-                            fwd.writeline(line)
-                elif self.opts.output or not self.opts.recursive or self.opts.recursive and self.opts.whitelist:
-                    for i in pxspace.import_strings(FLAG_IMPORT_ALL in self.flags or self.opts.recursive):
-                        imports.add(i)
+            #  Imports are disabled if extra declarations are defined
+            #  Extra declarations are disabled if recursive is enabled
+            #  Imports are also disabled if output is directed to a single file/stream
+            if FLAG_EXTRA_DECLS in self.flags and not self.opts.recursive:
+                fwd_decls = pxspace.forward_decls
 
-                for line in pxspace.lines(os.path.relpath(file, self.opts.relpath), FLAG_SYS_HEADER in self.flags):
-                    body.writeline(line)
+                for decl in fwd_decls:
+                    if decl not in fwd_keys:
+                        fwd_keys[decl] = _forward_decl_key(decl)
 
-                body.writeline('')
+                fwd_decls = sorted(fwd_decls, key=fwd_keys.__getitem__)
 
+                if len(fwd_decls):
+                    fwd.writeblock(block(fwd_decls, "toplevel", "cdef extern from *:", False))
+            elif self.opts.output or not self.opts.recursive or self.opts.recursive and self.opts.whitelist:
+                for i in pxspace.import_strings(FLAG_IMPORT_ALL in self.flags or self.opts.recursive):
+                    imports.add(i)
+
+            body.writeblock(pxspace.lines(os.path.relpath(file, self.opts.relpath), FLAG_SYS_HEADER in self.flags))
+            body.writeline('')
+
+            text = TabWriter()
+
+            text.writeblock(sorted(imports))
+
+            text.write('\n')
+
+            if FLAG_EXTRA_DECLS in self.flags:
+                text.writeline(fwd.getvalue())
+
+            text.writeline(body.getvalue())
+            result.append((space_name, text.getvalue()))
+
+        return result
+
+    def _emit(self, files: List[str], results: Iterable[List[Tuple[str, str]]]):
+        """
+        Write the rendered namespaces of each parsed header
+        to the output directory or stdout.
+
+        @param files: The parsed headers, in the same order as results.
+        @param results: The output of parse for each header.
+        @return: None.
+        """
+        # Context which contains a mapping of namespace->IOStream
+        # The IOStream has the text for the __init__.pxd of each
+        # namespace
+        ctx = dict()
+
+        for file, spaces in zip(files, results):
+            for space_name, text in spaces:
                 if self.opts.output:
                     pxd = os.path.splitext(os.path.basename(file))[0] + ".pxd"
                     out_path = os.path.join(self.opts.output, space_name.replace("::", os.path.sep))
@@ -206,26 +290,10 @@ class PxdGen:
                     if not os.path.isdir(out_path):
                         os.makedirs(out_path)
 
-                    stream = open(out_file, 'w')
+                    with open(out_file, 'w') as stream:
+                        stream.write(text)
                 else:
-                    stream = sys.stdout
-
-                try:
-                    for i in sorted(imports):
-                        stream.write(i)
-                        stream.write('\n')
-
-                    stream.write('\n')
-
-                    if FLAG_EXTRA_DECLS in self.flags:
-                        stream.write(fwd.getvalue())
-                        stream.write('\n')
-
-                    stream.write(body.getvalue())
-                    stream.write('\n')
-                finally:
-                    if stream is not sys.stdout:
-                        stream.close()
+                    sys.stdout.write(text)
 
         if self.opts.output:
             for space_name in ctx:
@@ -239,6 +307,59 @@ class PxdGen:
                 with open(os.path.join(out_path, "__init__.pxd"), 'w') as out:
                     out.write(ctx[space_name].getvalue())
 
+    def __getstate__(self):
+        # The Clang index cannot be pickled, worker processes create their own
+        state = self.__dict__.copy()
+        del state["index"]
+        return state
+
+    def __setstate__(self, state):
+        # Only spawned workers unpickle the instance, forked ones inherit the
+        # index. It is created by the first task rather than here, as a
+        # failing pool initializer is restarted instead of reported.
+        self.__dict__.update(state)
+        self.index = None
+
+
+def _forward_decl_key(decl: CCursor) -> Tuple[int, str, int, str, int, int]:
+    """
+    The key ordering forward declarations, by the number of types they
+    depend on. The set the declarations come from has no stable order,
+    so ties are broken by address, kind and source location.
+
+    @param decl: A forward declaration.
+    @return: Sort key.
+    """
+    cursor = decl.cursor
+    location = cursor.location
+    file = location.file
+
+    return (
+        len(Namespace._get_all_assoc(cursor)),
+        decl.address,
+        cursor._kind_id,
+        file.name if file is not None else '',
+        location.line,
+        location.column
+    )
+
+
+# The PxdGen instance used by the current worker process
+_worker: Optional[PxdGen] = None
+
+
+def _init_worker(proc: PxdGen):
+    global _worker
+    _worker = proc
+
+
+def _parse_header(file: str) -> List[Tuple[str, str]]:
+    # A ClangLoadError raised here is re-raised by the pool in the main process
+    if _worker.index is None:
+        _worker._load_clang(_worker.opts.libs)
+
+    return _worker.parse(file)
+
 
 def main():
     """
@@ -271,6 +392,9 @@ def main():
     argp.add_argument("-L", "--libclang-path",
                       dest="libs",
                       help="Specify the path to a directory containing libclang and its dependencies")
+    argp.add_argument("-j", "--jobs",
+                      type=int,
+                      help="Number of processes used to parse headers (defaults to 1)")
     argp.add_argument("-v", "--verbose",
                       action="store_true",
                       help="Print the status of the application to stdout")
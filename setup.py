@@ -14,9 +14,24 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import os
 from setuptools import setup
 
 
+# Optionally compile the cursor wrappers, the hottest module, with Cython.
+# The pure Python module stays the fallback when this is not enabled.
+ext_modules = list()
+
+if os.environ.get("PXDGEN_CYTHONIZE"):
+    from Cython.Build import cythonize
+
+    ext_modules = cythonize(
+        ["src/pxdgen/cursors.py"],
+        # Annotations are documentation only, as in the pure Python module
+        compiler_directives={"language_level": 3, "annotation_typing": False}
+    )
+
+
 with open("./README.md", 'r') as file:
     long_d = file.read()
 
@@ -27,6 +42,7 @@ setup(
     url="https://github.com/earowley/pxdgen",
     py_modules=["_pxdgen"],
     packages=["pxdgen", "pxdgen.utils"],
+    ext_modules=ext_modules,
     package_dir={
         "": "scripts",
         "pxdgen": "src/pxdgen"
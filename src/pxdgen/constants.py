@@ -15,69 +15,117 @@
 #    along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import re
+import sys
 import clang.cindex
 
 kinds = clang.cindex.CursorKind
+types = clang.cindex.TypeKind
 TAB_LENGTH = 4
 TAB = ' ' * TAB_LENGTH
-RE_DECLTYPE = re.compile("decltype\(.+\)")
-RE_CPP_INCLUDE = re.compile(" *#include *[<\"].+\.h(pp)?[>\"] *")
-RE_CPP_INT = re.compile("-?\d{1,20}[uU]?")
-RE_CPP_HEX = re.compile("-?0[xX][0-9A-Fa-f]+[uU]?")
-RE_CPP_FLOAT = re.compile("-?\d+(\.\d+)?[fF]?")
+# Indented lines emitted verbatim by block()
+TAB_PASS = TAB + "pass"
+TAB_STATICMETHOD = TAB + "@staticmethod"
+TAB_COMMENTED_STATICMETHOD = TAB + "#  @staticmethod"
+RE_DECLTYPE = re.compile(r"decltype\(.+\)")
+RE_CPP_INCLUDE = re.compile(r' *#include *[<"].+\.h(pp)?[>"] *')
+RE_CPP_INT = re.compile(r"-?\d{1,20}[uU]?")
+RE_CPP_HEX = re.compile(r"-?0[xX][0-9A-Fa-f]+[uU]?")
+RE_CPP_FLOAT = re.compile(r"-?\d+(\.\d+)?[fF]?")
 
-SPACE_KINDS = (
+SPACE_KINDS = frozenset((
     kinds.STRUCT_DECL,
     kinds.CLASS_DECL,
     kinds.CLASS_TEMPLATE,
     kinds.NAMESPACE
-)
-TEMPLATE_KINDS = (
+))
+TEMPLATE_KINDS = frozenset((
     kinds.TEMPLATE_TYPE_PARAMETER,
     kinds.TEMPLATE_NON_TYPE_PARAMETER
-)
-FUNCTION_KINDS = (
+))
+FUNCTION_KINDS = frozenset((
     kinds.FUNCTION_DECL,
     kinds.FUNCTION_TEMPLATE,
     kinds.CXX_METHOD
-)
-METHOD_KINDS = (
+))
+METHOD_KINDS = frozenset((
     kinds.FUNCTION_TEMPLATE,
     kinds.CXX_METHOD
-)
-STATIC_FUNCTION_KINDS = (
+))
+STATIC_FUNCTION_KINDS = frozenset((
     kinds.FUNCTION_DECL,
     kinds.FUNCTION_TEMPLATE
-)
-STRUCTURED_DATA_KINDS = (
+))
+STRUCTURED_DATA_KINDS = frozenset((
     kinds.STRUCT_DECL,
     kinds.CLASS_DECL,
     kinds.CLASS_TEMPLATE
-)
+))
+CLASS_KINDS = frozenset((
+    kinds.CLASS_DECL,
+    kinds.CLASS_TEMPLATE
+))
 # Anything 100% able to be represented by the DataType class
-BASIC_DATA_KINDS = (
+BASIC_DATA_KINDS = frozenset((
     kinds.PARM_DECL,
     kinds.VAR_DECL,
     kinds.FIELD_DECL
-)
-ANON_KINDS = STRUCTURED_DATA_KINDS + (
+))
+ANON_KINDS = STRUCTURED_DATA_KINDS | {
     kinds.ENUM_DECL,
     kinds.UNION_DECL
-)
-STRUCT_ATTR_KINDS = (
+}
+STRUCT_ATTR_KINDS = frozenset((
     kinds.ALIGNED_ATTR,
     kinds.PACKED_ATTR,
     kinds.WARN_UNUSED_ATTR,
     kinds.VISIBILITY_ATTR
-)
-TYPE_REFS = (
+))
+TYPE_REFS = frozenset((
     kinds.TYPE_REF,
     kinds.TEMPLATE_REF
-)
-TYPEDEF_KINDS = (
+))
+TYPEDEF_KINDS = frozenset((
     kinds.TYPEDEF_DECL,
     kinds.TYPE_ALIAS_DECL
-)
+))
+# Types which may be expanded with template arguments
+EXPANDABLE_TYPE_KINDS = frozenset((
+    types.ELABORATED,
+    types.UNEXPOSED
+))
+# Arrays without a constant size
+VARIABLE_ARRAY_KINDS = frozenset((
+    types.INCOMPLETEARRAY,
+    types.VARIABLEARRAY
+))
+UNSUPPORTED_TYPE_KINDS = frozenset((
+    types.BLOCKPOINTER,
+))
+# Builtin types, which reference no declaration
+BUILTIN_TYPE_KINDS = frozenset((
+    types.VOID,
+    types.BOOL,
+    types.CHAR_U,
+    types.UCHAR,
+    types.CHAR16,
+    types.CHAR32,
+    types.USHORT,
+    types.UINT,
+    types.ULONG,
+    types.ULONGLONG,
+    types.UINT128,
+    types.CHAR_S,
+    types.SCHAR,
+    types.WCHAR,
+    types.SHORT,
+    types.INT,
+    types.LONG,
+    types.LONGLONG,
+    types.INT128,
+    types.FLOAT,
+    types.DOUBLE,
+    types.LONGDOUBLE
+))
 IGNORED_IMPORTS = {
     "size_t",
     "ptrdiff_t",
@@ -133,4 +181,18 @@ STD_IMPORTS = {
     "std::vector": "libcpp.vector"
 }
 
+# CCursor addresses are interned, so interning the lookup keys lets the
+# import tables match them by identity instead of comparing characters
+IGNORED_IMPORTS = frozenset(sys.intern(k) for k in IGNORED_IMPORTS)
+REPLACED_IMPORTS = {sys.intern(k): v for k, v in REPLACED_IMPORTS.items()}
+STD_IMPORTS = {sys.intern(k): sys.intern(v) for k, v in STD_IMPORTS.items()}
+# Addresses that never need a declaration or cimport of their own
+UNDECLARED_IMPORTS = IGNORED_IMPORTS | frozenset(REPLACED_IMPORTS)
+# Complete cimport statement for each libc/libcpp type
+STD_IMPORT_STRINGS = {
+    k: f"from {v} cimport {k.rpartition('::')[2]} as {k.replace('::', '_')}"
+    for k, v in STD_IMPORTS.items()
+}
+
 del kinds
+del types
@@ -17,10 +17,122 @@
 from __future__ import annotations
 
 import os
+import sys
 import clang.cindex
+from collections import OrderedDict
+from operator import attrgetter
 from . import utils
+from .utils import cached_property
 from .constants import *
-from typing import Optional, Generator, Set, Any, Tuple, List
+from typing import Optional, Generator, Iterable, Set, FrozenSet, Any, Tuple, List, Dict
+
+
+# Kinds compared in per-cursor loops, bound once at import
+_CK_FIELD_DECL = clang.cindex.CursorKind.FIELD_DECL
+_CK_MACRO_DEFINITION = clang.cindex.CursorKind.MACRO_DEFINITION
+_CK_PARM_DECL = clang.cindex.CursorKind.PARM_DECL
+_CK_UNEXPOSED_EXPR = clang.cindex.CursorKind.UNEXPOSED_EXPR
+_CK_UNEXPOSED_EXPR_ID = _CK_UNEXPOSED_EXPR.value
+_TK_FUNCTIONPROTO = clang.cindex.TypeKind.FUNCTIONPROTO
+_AS_PRIVATE = clang.cindex.AccessSpecifier.PRIVATE
+_AS_PUBLIC = clang.cindex.AccessSpecifier.PUBLIC
+_SC_STATIC = clang.cindex.StorageClass.STATIC
+# Raw kind ids, tested against Cursor._kind_id in traversals so that
+# no CursorKind lookup is made for each visited cursor
+_TEMPLATE_IDS = frozenset(k.value for k in TEMPLATE_KINDS)
+_CK_TYPEDEF_DECL_ID = clang.cindex.CursorKind.TYPEDEF_DECL.value
+_CK_ENUM_CONSTANT_DECL_ID = clang.cindex.CursorKind.ENUM_CONSTANT_DECL.value
+_CK_PARM_DECL_ID = _CK_PARM_DECL.value
+_METHOD_KIND_IDS = frozenset(k.value for k in METHOD_KINDS)
+_TYPEDEF_KIND_IDS = frozenset(k.value for k in TYPEDEF_KINDS)
+_TYPE_REF_IDS = frozenset(k.value for k in TYPE_REFS)
+_CK_NO_DECL_FOUND_ID = clang.cindex.CursorKind.NO_DECL_FOUND.value
+# Kind ids whose definitions are followed by Namespace._get_all_assoc,
+# mapped to whether they are followed unconditionally. Records are
+# only followed when declared directly in a typedef.
+_REFERENCE_KIND_IDS = {
+    **{k.value: False for k in STRUCTURED_DATA_KINDS},
+    **{k.value: True for k in TYPE_REFS}
+}
+# Wrappers built by specialize(), keyed by libclang cursor hash
+_SPECIALIZE_CACHE: Dict[int, CCursor] = dict()
+# Results of Namespace._get_all_assoc, least recently used first
+_ASSOC_CACHE: OrderedDict[int, Tuple[clang.cindex.Cursor, FrozenSet[CCursor]]] = OrderedDict()
+_ASSOC_CACHE_SIZE = 10000
+# Results of utils.is_alias_unsupported for typedefs, keyed by libclang
+# cursor hash, as one typedef chain is walked for every use of the alias
+_ALIAS_CACHE: Dict[int, Tuple[clang.cindex.Cursor, bool]] = dict()
+# Translation unit the caches above were filled from
+_CACHE_TU: Optional[clang.cindex.TranslationUnit] = None
+
+
+def clear_cache() -> None:
+    """
+    Drop the wrappers and traversals memoized for the current
+    translation unit, releasing it. Called by Namespace when given
+    cursors of another translation unit, call it directly when
+    using specialize() without a Namespace.
+    """
+    global _CACHE_TU
+    _CACHE_TU = None
+    _SPECIALIZE_CACHE.clear()
+    _ASSOC_CACHE.clear()
+    _ALIAS_CACHE.clear()
+
+
+def _use_translation_unit(tu: clang.cindex.TranslationUnit) -> None:
+    """
+    Clear the caches if they were filled from another translation unit.
+
+    @param tu: The translation unit about to be converted.
+    @return: None.
+    """
+    global _CACHE_TU
+
+    if tu is not _CACHE_TU:
+        clear_cache()
+        _CACHE_TU = tu
+
+
+def _references_type(child: clang.cindex.Cursor, parent: clang.cindex.Cursor) -> bool:
+    """
+    Whether a descendant visited by Namespace._get_all_assoc
+    refers to a type whose definition should be followed.
+
+    @param child: The visited cursor.
+    @param parent: The cursor whose children are being visited.
+    @return: Boolean.
+    """
+    # Most visited cursors are rejected by this single lookup
+    unconditional = _REFERENCE_KIND_IDS.get(child._kind_id)
+
+    if unconditional is None:
+        return False
+
+    return unconditional or parent._kind_id == _CK_TYPEDEF_DECL_ID and bool(child.spelling)
+
+
+def _is_alias_unsupported(decl: clang.cindex.Cursor) -> bool:
+    """
+    Memoized utils.is_alias_unsupported. Only typedefs
+    have a chain to walk, other declarations are tested
+    directly.
+
+    @param decl: A referenced declaration.
+    @return: bool.
+    """
+    if decl._kind_id not in _TYPEDEF_KIND_IDS:
+        return utils.is_alias_unsupported(decl)
+
+    key = decl.hash
+    hit = _ALIAS_CACHE.get(key)
+
+    if hit is not None and hit[0] == decl:
+        return hit[1]
+
+    result = utils.is_alias_unsupported(decl)
+    _ALIAS_CACHE[key] = (decl, result)
+    return result
 
 
 def specialize(cursor: clang.cindex.Cursor) -> CCursor:
@@ -28,27 +140,28 @@ def specialize(cursor: clang.cindex.Cursor) -> CCursor:
     Determine what abstracted class defined in this
     module to use for a specific cursor.
 
+    Wrappers are memoized until clear_cache() is called,
+    which Namespace does for each new translation unit.
+
     @param cursor : A cursor to convert to a class from this module.
     @return       : The converted type.
     """
-    if cursor.kind in BASIC_DATA_KINDS:
-        return DataType(cursor)
-    elif utils.is_constructor(cursor):
-        return Constructor(cursor)
-    elif cursor.kind in FUNCTION_KINDS:
-        return Function(cursor)
-    elif cursor.kind == clang.cindex.CursorKind.ENUM_DECL:
-        return Enumeration(cursor)
-    elif cursor.kind == clang.cindex.CursorKind.UNION_DECL:
-        return Union(cursor)
-    elif cursor.kind in TYPEDEF_KINDS:
-        return Typedef(cursor)
-    elif cursor.kind in STRUCTURED_DATA_KINDS:
-        return Struct(cursor)
-    elif cursor.kind == clang.cindex.CursorKind.MACRO_DEFINITION:
-        return Macro(cursor)
-    else:
-        return CCursor(cursor)
+    key = cursor.hash
+    hit = _SPECIALIZE_CACHE.get(key)
+
+    if hit is not None and hit.cursor == cursor:
+        return hit
+
+    kind_id = cursor._kind_id
+    cls = _SPECIALIZED_CLASSES.get(kind_id, CCursor)
+
+    # Templated constructors are function templates or methods
+    if kind_id in _METHOD_KIND_IDS and utils.is_constructor(cursor):
+        cls = Constructor
+
+    result = cls(cursor)
+    _SPECIALIZE_CACHE[key] = result
+    return result
 
 
 def block(children: List[CCursor], name: str, header: str, restrict: bool) -> Generator[str, None, None]:
@@ -62,22 +175,36 @@ def block(children: List[CCursor], name: str, header: str, restrict: bool) -> Ge
                       have restricted declarations.
     @return         : Generator[str]
     """
-    forward_decls = list()
-    anonymous_decls = list()
+    # Dicts deduplicate while keeping the declaration order, so that
+    # the generated anonymous names are stable between runs
+    forward_decls = dict()
+    anonymous_decls = dict()
+    # Children declared in the body, with their kinds
+    members = list()
 
     for child in children:
+        # Children are specialized, so the kind determines their class
+        kind = child.cursor.kind
         if child.forward:
-            forward_decls.append(child)
+            forward_decls[child] = None
         elif child.anonymous:
-            anonymous_decls.append(child)
-        for assoc in CCursor._base_assoc_types(child.cursor):
+            anonymous_decls[child] = None
+        else:
+            members.append((child, kind))
+        # Macro definitions have no children to reference types
+        if kind == _CK_MACRO_DEFINITION:
+            continue
+        for assoc in CCursor._base_assoc_types(child.children):
             if assoc.forward:
-                forward_decls.append(assoc)
+                forward_decls[assoc] = None
             elif assoc.anonymous:
-                anonymous_decls.append(assoc)
+                anonymous_decls[assoc] = None
 
-    forward_decls = list(set(forward_decls))
-    anonymous_decls = list(set(anonymous_decls))
+    forward_decls = list(forward_decls)
+    anonymous_decls = list(anonymous_decls)
+    # Raw Clang cursors are matched against these by their libclang hash,
+    # confirming the hit with a single equality check
+    anonymous_index = {decl.cursor.hash: i for i, decl in enumerate(anonymous_decls)}
     prefix = '' if restrict else TAB
 
     if not restrict:
@@ -93,27 +220,22 @@ def block(children: List[CCursor], name: str, header: str, restrict: bool) -> Ge
     if restrict:
         yield header
 
-    typedefs = list()
-    declared_typedefs = list()
+    typedefs = dict()
+    declared_typedefs = dict()
     count = 0
 
-    for child in children:
-        if child.anonymous or child.forward:
-            continue
-        if child.cursor.kind in ANON_KINDS and not child.name:
-            typedefs.append(child)
+    for child, kind in members:
+        if kind in ANON_KINDS and not child.name:
+            typedefs[child.cursor.hash] = child
             continue
         count += 1
-        if isinstance(child, DataType):
-            ut, token = utils.get_underlying_type(child.cursor.type)
-            decl = ut.get_declaration()
+        if kind in BASIC_DATA_KINDS:
+            token = child.underlying[1]
+            decl = child.underlying_declaration
 
-            try:
-                ind = anonymous_decls.index(decl)
-            except ValueError:
-                ind = -1
+            ind = anonymous_index.get(decl.hash, -1)
 
-            if ind != -1:
+            if ind != -1 and anonymous_decls[ind] == decl:
                 i = token.find('[')
 
                 if i != -1:
@@ -122,57 +244,69 @@ def block(children: List[CCursor], name: str, header: str, restrict: bool) -> Ge
                 else:
                     suffix = ''
 
-                yield TAB + f"pxdgen_anon_{name}_{ind}{token} {child.name}{suffix}"
+                yield f"{TAB}pxdgen_anon_{name}_{ind}{token} {child.name}{suffix}"
                 continue
-        elif isinstance(child, Typedef):
-            ut, token = utils.get_underlying_type(child.cursor.underlying_typedef_type)
-            utd = ut.get_declaration()
+        elif kind in TYPEDEF_KINDS:
+            token = child.underlying[1]
+            utd = child.underlying_declaration
 
-            try:
-                ind = typedefs.index(utd)
-            except ValueError:
-                ind = -1
+            key = utd.hash
+            td = typedefs.get(key)
 
-            if ind != -1:
-                td = typedefs.pop(ind)
+            if td is not None and td == utd:
+                del typedefs[key]
 
                 for line in td.lines(name=child.name, typedef=True):
                     yield TAB + line
 
-                declared_typedefs.append((td, child.name))
+                declared_typedefs.setdefault(key, (td, child.name))
                 continue
 
-            found = False
-
-            for decl, name in declared_typedefs:
-                if decl == utd:
-                    yield TAB + f"ctypedef {name}{token} {child.name}"
-                    found = True
-                    break
+            declared, alias = declared_typedefs.get(key, (None, None))
 
-            if found:
+            if declared is not None and declared == utd:
+                yield f"{TAB}ctypedef {alias}{token} {child.name}"
                 continue
 
-        for i, line in enumerate(child.lines()):
-            commented = line.strip().startswith('#')
-            if restrict and isinstance(child, Function) and child.is_static_method:
-                yield TAB + ("#  " if commented else '') + "@staticmethod"
+        static_method = restrict and kind in FUNCTION_KINDS and child.is_static_method
+
+        lines = child.lines()
+        first = next(lines, None)
+
+        if first is None:
+            count -= 1
+            continue
+
+        commented = first.lstrip().startswith('#')
+        if static_method:
+            yield TAB_COMMENTED_STATICMETHOD if commented else TAB_STATICMETHOD
+        yield TAB + first
+        multiline = False
+
+        for line in lines:
+            multiline = True
+            if static_method:
+                yield TAB_COMMENTED_STATICMETHOD if line.lstrip().startswith('#') else TAB_STATICMETHOD
             yield TAB + line
 
-        if i == 0 and commented:
+        # A child rendered as a single commented line declares nothing
+        if commented and not multiline:
             count -= 1
 
     if not count:
-        yield TAB + "pass"
+        yield TAB_PASS
 
 
 class CCursor:
+    # Wrappers are created for every referenced declaration
+    __slots__ = ("cursor", "_cache")
+
     def __init__(self, cursor: clang.cindex.Cursor):
         self.cursor = cursor
-        self._address = "::".join((self.location, self.name)).strip("::")
+        self._cache = dict()
 
     def __iter__(self):
-        return self.cursor.get_children()
+        return iter(self.children)
 
     def __eq__(self, other: Any):
         if isinstance(other, CCursor):
@@ -182,7 +316,7 @@ class CCursor:
         raise NotImplementedError(f"CCursor not comparable to type {type(other)}")
 
     def __hash__(self) -> int:
-        return self._address.__hash__()
+        return self._hash
 
     @property
     def is_space(self):
@@ -203,53 +337,69 @@ class CCursor:
 
         @return: Boolean.
         """
-        return self.cursor.storage_class == clang.cindex.StorageClass.STATIC
+        return self.cursor.storage_class == _SC_STATIC
 
-    @property
+    @cached_property
     def parent(self) -> Optional[CCursor]:
         p = self.cursor.lexical_parent
         return None if p is None else specialize(p)
 
     @property
     def visible(self) -> bool:
-        return self.cursor.access_specifier == clang.cindex.AccessSpecifier.PUBLIC
+        return self.cursor.access_specifier == _AS_PUBLIC
 
-    @property
+    @cached_property
+    def children(self) -> List[clang.cindex.Cursor]:
+        """
+        The direct children of this cursor, visited once
+        and shared by every consumer of this instance.
+
+        @return: List of Clang cursors.
+        """
+        return list(self.cursor.get_children())
+
+    @cached_property
     def file(self) -> Optional[str]:
-        try:
-            return os.path.abspath(self.cursor.location.file.name)
-        except AttributeError:
-            return None
+        source = self.cursor.location.file
+        # Builtin declarations have no file
+        return None if source is None else utils.abspath(source.name)
 
-    @property
+    @cached_property
     def anonymous(self) -> bool:
         return utils.is_anonymous(self.cursor)
 
-    @property
+    @cached_property
     def forward(self) -> bool:
         return utils.is_forward_decl(self.cursor)
 
-    @property
+    @cached_property
     def name(self) -> str:
         return self.cursor.spelling
 
-    @property
+    @cached_property
     def display(self) -> str:
         return self.cursor.displayname
 
-    @property
+    @cached_property
     def namespace(self) -> str:
         return utils.get_cursor_namespace(self.cursor)
 
-    @property
+    @cached_property
     def location(self) -> str:
         return utils.get_cursor_location(self.cursor)
 
-    @property
+    @cached_property
     def address(self) -> str:
-        return self._address
+        # Computed on first use, as most wrappers are never printed
+        return sys.intern(utils.get_address(self.location, self.name))
 
-    @property
+    @cached_property
+    def _hash(self) -> int:
+        # libclang hashes the same fields clang_equalCursors compares,
+        # so no address string is built to hash a wrapper
+        return self.cursor.hash
+
+    @cached_property
     def associated_types(self) -> Set[CCursor]:
         """
         Get the associated types within this cursor.
@@ -260,9 +410,9 @@ class CCursor:
         Remarks: Int is not included as it is built-in.
         @return: List of cursors containing the definition of each type.
         """
-        return CCursor._base_assoc_types(self.cursor)
+        return CCursor._base_assoc_types(self.children)
 
-    @property
+    @cached_property
     def unsupported(self) -> bool:
         """
         Whether this declaration uses a C++ construct
@@ -270,41 +420,49 @@ class CCursor:
 
         @return: bool.
         """
-        unsupported_types = (clang.cindex.TypeKind.BLOCKPOINTER,)
+        kind = self.cursor.type.kind
 
-        if self.cursor.type.kind in unsupported_types:
+        if kind in UNSUPPORTED_TYPE_KINDS:
             return True
+        # Nothing to resolve, the children are not walked
+        if kind in BUILTIN_TYPE_KINDS:
+            return False
 
-        for child in self.cursor.get_children():
-            if child.kind in TYPE_REFS:
+        for child in self.children:
+            if child._kind_id in _TYPE_REF_IDS:
                 d = child.get_definition() or child.type.get_declaration()
 
-                if utils.is_alias_unsupported(d):
+                if _is_alias_unsupported(d):
                     return True
 
         return utils.is_typename_unsupported(self.cursor.type)
 
     @staticmethod
-    def _base_assoc_types(cursor: clang.cindex.Cursor) -> Set[CCursor]:
-        result = set()
-
-        for child in cursor.get_children():
-            if child.kind in TYPE_REFS:
+    def _base_assoc_types(children: Iterable[clang.cindex.Cursor]) -> Set[CCursor]:
+        # Repeated references to one declaration are common in templated
+        # code, so duplicates are dropped before wrapping them. Cursors
+        # hash with clang_hashCursor and compare with clang_equalCursors,
+        # so colliding hashes are told apart.
+        decls = dict()
+
+        for child in children:
+            if child._kind_id in _TYPE_REF_IDS:
                 cdef = child.get_definition()
-                if cdef is not None:
-                    result.add(specialize(cdef))
-                else:
+                if cdef is None:
                     cdef = child.type.get_declaration()
-                    if cdef.kind != clang.cindex.CursorKind.NO_DECL_FOUND:
-                        result.add(specialize(cdef))
+                    if cdef._kind_id == _CK_NO_DECL_FOUND_ID:
+                        continue
+                decls[cdef] = None
 
-        return result
+        return {specialize(cdef) for cdef in decls}
 
     def lines(self, **kwargs) -> Generator[str, None, None]:
         raise NotImplementedError(f"Abstract method `lines` called in CCursor abstract class with cursor {self.cursor.kind}:{self.cursor.spelling}")
 
 
 class DataType(CCursor):
+    __slots__ = ()
+
     def __init__(self, cursor: clang.cindex.Cursor):
         """
         Represents a simple variable or constant declaration,
@@ -314,36 +472,54 @@ class DataType(CCursor):
         """
         super().__init__(cursor)
 
-    @property
+    @cached_property
     def associated_types(self) -> Set[CCursor]:
         """
         Override from base class to support
         function pointers.
         """
-        result = super().associated_types
+        result = set(super().associated_types)
 
-        if self.is_function_pointer:
-            for child in self.cursor.get_children():
-                if child.kind == clang.cindex.CursorKind.PARM_DECL:
-                    result.update(DataType(child).associated_types)
+        for arg in self._pointer_args:
+            result.update(arg.associated_types)
 
         return result
 
-    @property
+    @cached_property
     def unsupported(self) -> bool:
-        if self.is_function_pointer:
-            for child in self.cursor.get_children():
-                if child.kind == clang.cindex.CursorKind.PARM_DECL:
-                    if DataType(child).unsupported:
-                        return True
+        if any(arg.unsupported for arg in self._pointer_args):
+            return True
 
         return super().unsupported
 
-    @property
+    @cached_property
     def is_function_pointer(self) -> bool:
         return utils.is_function_pointer(self.cursor.type)
 
-    @property
+    @cached_property
+    def _pointer_args(self) -> List[DataType]:
+        # Parameters of a function pointer, wrapped once for both
+        # associated_types and unsupported
+        if not self.is_function_pointer:
+            return []
+
+        return [DataType(child) for child in self.children if child._kind_id == _CK_PARM_DECL_ID]
+
+    @cached_property
+    def underlying(self) -> Tuple[clang.cindex.Type, str]:
+        """
+        The type unwrapped from pointers, arrays, etc.
+        and the token describing the wrapping.
+
+        @return: Tuple[clang.cindex.Type, str]
+        """
+        return utils.get_underlying_type(self.cursor.type)
+
+    @cached_property
+    def underlying_declaration(self) -> clang.cindex.Cursor:
+        return self.underlying[0].get_declaration()
+
+    @cached_property
     def declaration(self) -> str:
         """
         The declaration of this Member in Cython syntax.
@@ -356,11 +532,10 @@ class DataType(CCursor):
         if self.is_function_pointer:
             return self._function_ptr_declaration
 
-        ut, token = utils.get_underlying_type(self.cursor.type)
-        utd = ut.get_declaration()
+        token = self.underlying[1]
 
         # If the anonymous declaration has not already been handled, default
-        if utils.is_anonymous(utd):
+        if utils.is_anonymous(self.underlying_declaration):
             # Pointer coersion is easier for void* than array of chars
             if token.count('*') == len(token):
                 typename = f"void{token}"
@@ -382,7 +557,7 @@ class DataType(CCursor):
 
         return f"{utils.convert_dialect(typename)} {self.name}{suffix}"
 
-    @property
+    @cached_property
     def typename(self) -> str:
         return utils.full_type_repr(self.cursor.type, self.cursor)
 
@@ -409,6 +584,8 @@ class DataType(CCursor):
 
 
 class Macro(CCursor):
+    __slots__ = ()
+
     def __init__(self, cursor):
         super().__init__(cursor)
 
@@ -420,17 +597,17 @@ class Macro(CCursor):
         @return: Generator[str]
         """
         macro_type = "const int"
-        tokens = [t.spelling for t in self.cursor.get_tokens()]
+        tokens = list(map(attrgetter("spelling"), self.cursor.get_tokens()))
         func = self.cursor.is_macro_function()
         i = 1 if not func else (tokens.index(')') + 1)
         macro_def = ''.join(tokens[i:])
         eq = True
 
-        if re.fullmatch(RE_CPP_INT, macro_def):
+        if RE_CPP_INT.fullmatch(macro_def):
             macro_type = "const long"
-        elif re.fullmatch(RE_CPP_HEX, macro_def):
+        elif RE_CPP_HEX.fullmatch(macro_def):
             macro_type = "const unsigned long"
-        elif re.fullmatch(RE_CPP_FLOAT, macro_def):
+        elif RE_CPP_FLOAT.fullmatch(macro_def):
             macro_type = "const double"
             macro_def = macro_def.strip("fF")
         else:
@@ -440,6 +617,8 @@ class Macro(CCursor):
 
 
 class Function(CCursor):
+    __slots__ = ("_tmpl_params", "_args")
+
     CYTHON_UNSUPPORTED = {
         "operator+=",
         "operator-=",
@@ -459,10 +638,10 @@ class Function(CCursor):
         @param cursor: Clang cursor.
         """
         super().__init__(cursor)
-        self._tmpl_params = utils.get_template_params(cursor)
+        self._tmpl_params = utils.get_template_params(cursor, self.children)
         # get_arguments() yields nothing for function templates
         # testing cursor.kind manually for now to handle both cases
-        self._args = [DataType(child) for child in cursor.get_children() if child.kind == clang.cindex.CursorKind.PARM_DECL]
+        self._args = [DataType(child) for child in self.children if child.kind == _CK_PARM_DECL]
 
     @property
     def is_static_method(self) -> bool:
@@ -473,29 +652,30 @@ class Function(CCursor):
         """
         return self.cursor.is_static_method()
 
-    @property
+    @cached_property
     def associated_types(self) -> Set[CCursor]:
         """
         Associated types for this function.
 
         @return: Set[CCursor]
         """
-        result = super().associated_types
+        result = set(super().associated_types)
 
         for arg in self._args:
             result.update(arg.associated_types)
 
         return result
 
-    @property
+    @cached_property
     def unsupported(self) -> bool:
+        # Cheapest checks first
         return (
-            any(arg.unsupported for arg in self._args) or
             utils.is_typename_unsupported(self.cursor.result_type) or
+            any(arg.unsupported for arg in self._args) or
             super().unsupported
         )
 
-    @property
+    @cached_property
     def first_optional_arg_index(self) -> int:
         """
         Gets the first optional argument index for
@@ -504,14 +684,11 @@ class Function(CCursor):
 
         @return: First optional argument index.
         """
-        n = len(self._args)
-
         for i, arg in enumerate(self._args):
-            if any(child.kind == clang.cindex.CursorKind.UNEXPOSED_EXPR for child in arg):
-                n = i
-                break
+            if any(child._kind_id == _CK_UNEXPOSED_EXPR_ID for child in arg):
+                return i
 
-        return n
+        return len(self._args)
 
     def lines(self, **kwargs) -> Generator[str, None, None]:
         """
@@ -521,42 +698,71 @@ class Function(CCursor):
         @param kwargs: No kwargs to specify.
         @return: Generator over lines.
         """
-        comment = (
-            self.unsupported or
-            self.cursor.spelling in Function.CYTHON_UNSUPPORTED or
-            self.cursor.spelling.startswith('operator""')
-        )
         n = self.first_optional_arg_index
-        restype = utils.convert_dialect(utils.full_type_repr(self.cursor.result_type, self.cursor))
+        restype = self._restype
+        prefix = self._comment_prefix
 
         for i in range(n, len(self._args) + 1):
             args = self._argument_declarations(i)
-            prefix = "#  " if comment else ''
 
-            if utils.is_function_pointer(self.cursor.result_type):
-                i = restype.index(')')
-                yield f"{prefix}{restype[:i]}{self.name}{self._tmpl_params}({', '.join(args)}){restype[i:]}"
+            if self._returns_function_pointer:
+                j = restype.index(')')
+                yield f"{prefix}{restype[:j]}{self.name}{self._tmpl_params}({', '.join(args)}){restype[j:]}"
             else:
                 yield f"{prefix}{restype} {self.name}{self._tmpl_params}({', '.join(args)})"
 
-    def _argument_declarations(self, nargs: int) -> Generator[str, None, None]:
-        """
-        Returns whether there was an error and the Cython argument
-        declarations of this function.
-        """
+    @cached_property
+    def _comment_prefix(self) -> str:
+        # Shared by every overload yielded by lines()
+        spelling = self.cursor.spelling
+        comment = (
+            self.unsupported or
+            spelling in Function.CYTHON_UNSUPPORTED or
+            spelling.startswith('operator""')
+        )
+        return "#  " if comment else ''
 
-        for mem in self._args[:nargs]:
-            # `=*` syntax seems to only work for cdef functions defined in pyx files
-            # suffix = "=*" if any(child.kind == clang.cindex.CursorKind.UNEXPOSED_EXPR for child in mem) else ''
-            yield utils.convert_dialect(mem.typename)
+    @cached_property
+    def is_variadic(self) -> bool:
+        """
+        Whether this function takes a C variadic argument.
 
+        @return: Boolean.
+        """
         # Variadic argument does not get represented in children or get_arguments()
         # So utils function uses tokens
-        if utils.is_function_variadic(self.cursor):
-            yield "..."
+        return utils.is_function_variadic(self.cursor)
+
+    @cached_property
+    def _restype(self) -> str:
+        return utils.convert_dialect(utils.full_type_repr(self.cursor.result_type, self.cursor))
+
+    @cached_property
+    def _returns_function_pointer(self) -> bool:
+        return utils.is_function_pointer(self.cursor.result_type)
+
+    @cached_property
+    def _argument_types(self) -> List[str]:
+        # `=*` syntax seems to only work for cdef functions defined in pyx files
+        # suffix = "=*" if any(child.kind == _CK_UNEXPOSED_EXPR for child in mem) else ''
+        return [utils.convert_dialect(mem.typename) for mem in self._args]
+
+    def _argument_declarations(self, nargs: int) -> List[str]:
+        """
+        The Cython argument declarations of this function,
+        truncated to the first `nargs` arguments.
+        """
+        result = self._argument_types[:nargs]
+
+        if self.is_variadic:
+            result.append("...")
+
+        return result
 
 
 class Constructor(Function):
+    __slots__ = ()
+
     def __init__(self, cursor: clang.cindex.Cursor):
         super().__init__(cursor)
 
@@ -567,22 +773,20 @@ class Constructor(Function):
         @param kwargs: None for this type.
         @return: Generator over lines.
         """
-        spelling = self.name
+        spelling = self.name.partition('<')[0]
         restype = "void " if self._tmpl_params else ''
+        prefix = "#  " if self.unsupported else ''
         n = self.first_optional_arg_index
 
-        try:
-            spelling = spelling[:spelling.index('<')]
-        except ValueError:
-            pass
-
         for i in range(n, len(self._args) + 1):
             args = self._argument_declarations(i)
 
-            yield ("#  " if self.unsupported else '') + f"{restype}{spelling}{self._tmpl_params}({', '.join(args)})"
+            yield f"{prefix}{restype}{spelling}{self._tmpl_params}({', '.join(args)})"
 
 
 class Enumeration(CCursor):
+    __slots__ = ()
+
     def __init__(self, cursor: clang.cindex.Cursor):
         """
         Represents an enum, given an enum Cursor.
@@ -600,27 +804,34 @@ class Enumeration(CCursor):
         @return: Generator over lines.
         """
         yield Enumeration.cython_header(kwargs.get("typedef", False), kwargs.get("name", self.name))
+        yield from self.members(TAB)
 
-        for line in self.members():
-            yield TAB + line
-
-    def members(self) -> Generator[str, None, None]:
+    def members(self, indent: str = '') -> Generator[str, None, None]:
         """
         Iterator over the members of this enum.
 
+        @param indent: Prefix of each line, built into the same string.
         @return: Generator[str, None, None]
         """
         gen = 0
-        for kind, spelling, enum_value in Enumeration.iterate(self.cursor):
-            if kind == clang.cindex.CursorKind.ENUM_CONSTANT_DECL:
+        # Fields are only read from the enumerators
+        for child in self.children:
+            if child._kind_id == _CK_ENUM_CONSTANT_DECL_ID:
                 gen += 1
-                yield f"{spelling} = {enum_value}"
+                yield f"{indent}{child.spelling} = {child.enum_value}"
 
         if not gen:
-            yield "pass"
+            yield indent + "pass"
 
     @staticmethod
     def iterate(cursor: clang.cindex.Cursor) -> Generator[Tuple[clang.cindex.CursorKind, str, int], None, None]:
+        """
+        Iterator over the kind, name and value of each child of an enum.
+        Not used by members, which reads the enumerators directly.
+
+        @param cursor: The enum declaration.
+        @return: Generator[Tuple[CursorKind, str, int]]
+        """
         for child in cursor.get_children():
             yield child.kind, child.spelling, child.enum_value
 
@@ -637,6 +848,8 @@ class Enumeration(CCursor):
 
 
 class Union(CCursor):
+    __slots__ = ("_children",)
+
     def __init__(self, cursor: clang.cindex.Cursor):
         """
         Represents a union, given a union Cursor.
@@ -646,11 +859,12 @@ class Union(CCursor):
         super().__init__(cursor)
         self._children = list()
 
-        for child in cursor.get_children():
-            if (child.kind == clang.cindex.CursorKind.FIELD_DECL and child.spelling) or child.kind in ANON_KINDS:
+        for child in self.children:
+            kind = child.kind
+            if (kind == _CK_FIELD_DECL and child.spelling) or kind in ANON_KINDS:
                 self._children.append(specialize(child))
 
-    @property
+    @cached_property
     def associated_types(self) -> Set[CCursor]:
         result = set()
 
@@ -668,13 +882,12 @@ class Union(CCursor):
         @return: Generator[str]
         """
         name = kwargs.get("name", self.name)
-        for line in block(
+        yield from block(
             self._children,
             name,
             Union.cython_header(kwargs.get("typedef", False), name),
             True
-        ):
-            yield line
+        )
 
     @staticmethod
     def cython_header(typedef: bool, name: str) -> str:
@@ -689,6 +902,8 @@ class Union(CCursor):
 
 
 class Typedef(CCursor):
+    __slots__ = ()
+
     def __init__(self, cursor: clang.cindex.Cursor):
         """
         Represents a typedef, given the correct Clang Cursor.
@@ -704,12 +919,35 @@ class Typedef(CCursor):
 
         @return: The underlying type. A better form of `underlying_typedef_type`.
         """
-        return utils.get_underlying_type(self.cursor.underlying_typedef_type)[0]
+        return self.underlying[0]
 
-    @property
+    @cached_property
+    def underlying_typedef_type(self) -> clang.cindex.Type:
+        """
+        The aliased type, as written in the typedef.
+
+        @return: clang.cindex.Type
+        """
+        return self.cursor.underlying_typedef_type
+
+    @cached_property
+    def underlying(self) -> Tuple[clang.cindex.Type, str]:
+        """
+        The underlying type and the token describing its
+        wrapping, as given by `utils.get_underlying_type`.
+
+        @return: Tuple[clang.cindex.Type, str]
+        """
+        return utils.get_underlying_type(self.underlying_typedef_type)
+
+    @cached_property
+    def underlying_declaration(self) -> clang.cindex.Cursor:
+        return self.underlying[0].get_declaration()
+
+    @cached_property
     def unsupported(self) -> bool:
         return (
-            utils.is_typename_unsupported(self.cursor.underlying_typedef_type) or
+            utils.is_typename_unsupported(self.underlying_typedef_type) or
             super().unsupported
         )
 
@@ -720,7 +958,7 @@ class Typedef(CCursor):
         @param kwargs: None.
         @return: str.
         """
-        utt = self.cursor.underlying_typedef_type
+        utt = self.underlying_typedef_type
 
         if "__builtin_va_list" in (self.name, utt.spelling):
             yield f"ctypedef void* {self.name}"
@@ -733,28 +971,28 @@ class Typedef(CCursor):
 
         if utils.is_function_pointer(utt):
             # A function prototype can be typedefed but is not an lvalue reference
-            if utt.kind == clang.cindex.TypeKind.FUNCTIONPROTO:
+            if utt.kind == _TK_FUNCTIONPROTO:
                 yield "ctypedef " + result.replace("()", self.name, 1)
             else:
                 i = result.index(')')
                 yield "ctypedef " + result[:i] + self.name + result[i:]
             return
 
-        ut, token = utils.get_underlying_type(utt)
-        utd = ut.get_declaration()
+        utd = self.underlying_declaration
 
         # If typedef of another type has not been handled from higher level context
         if utd.kind in ANON_KINDS and not result.strip():
-            for line in specialize(utd).lines(name=self.name, typedef=True):
-                yield line
+            yield from specialize(utd).lines(name=self.name, typedef=True)
             return
 
         yield f"ctypedef {result} {self.name}"
 
 
 class Struct(CCursor):
+    __slots__ = ("_is_cppclass", "_children", "_tmpl_params")
+
     # Types yielded from members property
-    INSTANCE_TYPES = (
+    INSTANCE_TYPES = frozenset((
         clang.cindex.CursorKind.FIELD_DECL,
         clang.cindex.CursorKind.CONSTRUCTOR,
         clang.cindex.CursorKind.CXX_METHOD,
@@ -766,7 +1004,9 @@ class Struct(CCursor):
         clang.cindex.CursorKind.STRUCT_DECL,
         clang.cindex.CursorKind.CLASS_TEMPLATE,
         clang.cindex.CursorKind.UNION_DECL
-    )
+    ))
+    # Raw kind ids of INSTANCE_TYPES, tested before any libclang call
+    _INSTANCE_TYPE_IDS = frozenset(k.value for k in INSTANCE_TYPES)
 
     def __init__(self, cursor: clang.cindex.Cursor):
         """
@@ -776,19 +1016,19 @@ class Struct(CCursor):
         @param cursor: Clang struct/cppclass Cursor.
         """
         super().__init__(cursor)
-        self._is_cppclass = utils.is_cppclass(cursor)
+        self._is_cppclass = utils.is_cppclass(cursor, self.children)
         self._children = list()
-        self._tmpl_params = utils.get_template_params(cursor)
+        self._tmpl_params = utils.get_template_params(cursor, self.children)
 
-        for child in cursor.get_children():
-            if (
-                    child.access_specifier == clang.cindex.AccessSpecifier.PRIVATE or
-                    child.kind not in Struct.INSTANCE_TYPES or
-                    utils.is_extra_decl(child) or
-                    (child.kind not in ANON_KINDS and not child.spelling)
-            ):
+        instance_ids = Struct._INSTANCE_TYPE_IDS
+        append = self._children.append
+
+        for child in self.children:
+            if child._kind_id not in instance_ids or child.access_specifier == _AS_PRIVATE:
                 continue
-            self._children.append(specialize(child))
+            if utils.is_extra_decl(child) or (child.kind not in ANON_KINDS and not child.spelling):
+                continue
+            append(specialize(child))
 
     @property
     def is_cppclass(self) -> bool:
@@ -799,7 +1039,7 @@ class Struct(CCursor):
         """
         return self._is_cppclass
 
-    @property
+    @cached_property
     def associated_types(self) -> Set[CCursor]:
         result = set()
 
@@ -818,13 +1058,12 @@ class Struct(CCursor):
         """
         name = kwargs.get("name", self.name)
 
-        for line in block(
+        yield from block(
             self._children,
             name,
             self.cython_header(kwargs.get("typedef", False), name),
             True
-        ):
-            yield line
+        )
 
     def cython_header(self, typedef: bool, name: str) -> str:
         """
@@ -842,6 +1081,21 @@ class Struct(CCursor):
         )
 
 
+# Class used by specialize() for each raw cursor kind id
+_SPECIALIZED_CLASSES = {
+    **{k.value: DataType for k in BASIC_DATA_KINDS},
+    **{k.value: Function for k in FUNCTION_KINDS},
+    **{k.value: Typedef for k in TYPEDEF_KINDS},
+    **{k.value: Struct for k in STRUCTURED_DATA_KINDS},
+    clang.cindex.CursorKind.CONSTRUCTOR.value: Constructor,
+    clang.cindex.CursorKind.ENUM_DECL.value: Enumeration,
+    clang.cindex.CursorKind.UNION_DECL.value: Union,
+    clang.cindex.CursorKind.MACRO_DEFINITION.value: Macro
+}
+# Kind ids that specialize() does not leave as a plain CCursor
+_SPECIALIZED_KIND_IDS = frozenset(_SPECIALIZED_CLASSES)
+
+
 class Namespace:
     def __init__(self, cursors: list, recursive: bool, use_whitelist: bool, main_header: str,  valid_headers: set, *_):
         """
@@ -853,17 +1107,27 @@ class Namespace:
         @param main_header: The header file to accept declarations from.
         @param valid_headers: The set of headers being parsed.
         """
+        # Wrappers memoized for a previous translation unit are stale
+        _use_translation_unit(cursors[0].translation_unit)
         self.cursors = [CCursor(c) for c in cursors]
         self.cpp_name = self.cursors[0].address if cursors[0].kind in SPACE_KINDS else ''
         self.recursive = recursive
-        self.main_header = main_header
-        self.valid_headers = valid_headers
+        # Normalized once, so the filters compare the paths directly
+        self.main_header = utils.abspath(main_header)
+        self.valid_headers = frozenset(map(utils.abspath, valid_headers))
         self.children = list()
         self.use_whitelist = use_whitelist
         self.class_space = all(utils.is_cppclass(c) for c in cursors)
 
+        child_filter = self._child_filter
+        kind_ids = _SPECIALIZED_KIND_IDS
+
         for cursor in self.cursors:
-            self.children += filter(self._child_filter, cursor)
+            # The raw kind id rejects most children without a method call
+            self.children.extend([c for c in cursor if c._kind_id in kind_ids and child_filter(c)])
+
+        # Specialized once, in the same order as the children
+        self.members = [specialize(c) for c in self.children]
 
     @property
     def has_declarations(self) -> bool:
@@ -886,15 +1150,11 @@ class Namespace:
         assert not self.recursive, "Forward declarations should not be used when recursion is enabled"
 
         result = set()
+        main_header = self.main_header
 
         for child in self.children:
             for t in Namespace._get_all_assoc(child):
-                addr = t.address
-                if (
-                    t.file != self.main_header and
-                    addr not in IGNORED_IMPORTS and
-                    addr not in REPLACED_IMPORTS
-                ):
+                if t.file != main_header and t.address not in UNDECLARED_IMPORTS:
                     result.add(t)
 
         return result
@@ -907,16 +1167,14 @@ class Namespace:
         @param system_header: Whether angled brackets should be added to the header name.
         @return: Generator[str]
         """
-        children = [specialize(c) for c in self.children]
         name = self.cursors[0].address if self.cursors[0].cursor.kind in SPACE_KINDS else 'toplevel'
 
-        for line in block(
-            children,
+        yield from block(
+            self.members,
             name,
             self.cython_header(rel_header_path, system_header),
             False
-        ):
-            yield line
+        )
 
     def cython_header(self, rel_header_path: str, system_header: bool) -> str:
         """
@@ -942,30 +1200,31 @@ class Namespace:
         @return: A set of import strings.
         """
         result = set()
+        default = os.path.splitext(os.path.basename(self.main_header))[0] if self.recursive else None
+        valid_headers = self.valid_headers
+        whitelisted = self.recursive and self.use_whitelist
 
-        for child in self.children:
-            for t in specialize(child).associated_types:
+        for child, member in zip(self.children, self.members):
+            for t in member.associated_types:
 
-                if t.cursor.kind in TEMPLATE_KINDS:
+                if t.cursor._kind_id in _TEMPLATE_IDS:
                     continue
 
-                if t.file not in self.valid_headers:
+                in_valid_header = t.file in valid_headers
+
+                if not in_valid_header:
                     # Handle if import should be done via libc/libcpp
-                    stdpath = STD_IMPORTS.get(t.address)
+                    stdimport = STD_IMPORT_STRINGS.get(t.address)
 
-                    if stdpath is not None:
-                        result.add(f"from {stdpath} cimport {t.name} as {t.address.replace('::', '_')}")
+                    if stdimport is not None:
+                        result.add(stdimport)
                         continue
 
                     if not include_all:
                         continue
 
-                if self.recursive and self.use_whitelist:
-                    packed = t.file in self.valid_headers
-                else:
-                    packed = self.recursive
+                packed = in_valid_header if whitelisted else self.recursive
 
-                default = os.path.splitext(os.path.basename(self.main_header))[0] if self.recursive else None
                 res = utils.get_import_string(child, t.cursor, packed, default)
 
                 if res is not None:
@@ -976,51 +1235,92 @@ class Namespace:
     def _child_filter(self, child: clang.cindex.Cursor):
         """
         Filters out invalid/invisible child cursors of this namespace.
+        The caller has already checked that the child is of a kind
+        specialize() handles.
         """
-        if child.access_specifier == clang.cindex.AccessSpecifier.PRIVATE:
+        if self.class_space and child._kind_id in Struct._INSTANCE_TYPE_IDS:
             return False
-        if self.class_space and child.kind in Struct.INSTANCE_TYPES:
+        if child.access_specifier == _AS_PRIVATE:
             return False
         if utils.is_extra_decl(child):
             return False
-        if type(specialize(child)) is CCursor:
-            return False
-        try:
-            file_name = os.path.abspath(child.location.file.name)
-            return (
-                self.recursive and not self.use_whitelist or
-                self.recursive and self.use_whitelist and file_name in self.valid_headers or
-                file_name == self.main_header
-            )
-        except AttributeError:
+
+        source = child.location.file
+
+        # Builtin declarations have no file
+        if source is None:
             return False
+        # Every file is accepted, the path is not needed
+        if self.recursive and not self.use_whitelist:
+            return True
+
+        file_name = utils.abspath(source.name)
+        return (
+            self.recursive and file_name in self.valid_headers or
+            file_name == self.main_header
+        )
 
     @staticmethod
-    def _get_all_assoc(cursor: clang.cindex.Cursor) -> Set[CCursor]:
-        result = set()
-        stack = [cursor]
+    def _get_all_assoc(cursor: clang.cindex.Cursor) -> FrozenSet[CCursor]:
+        """
+        All types referenced by a declaration, following the
+        definitions of referenced types transitively. Memoized
+        until `clear_cache` is called.
 
-        while len(stack):
-            current = stack.pop()
+        @param cursor: The declaration to inspect.
+        @return: FrozenSet[CCursor]
+        """
+        key = cursor.hash
+        hit = _ASSOC_CACHE.get(key)
 
-            for child in current.get_children():
-                stack.append(child)
+        if hit is not None and hit[0] == cursor:
+            _ASSOC_CACHE.move_to_end(key)
+            return hit[1]
 
-                if (child.kind in TYPE_REFS or
-                        (current.kind == clang.cindex.CursorKind.TYPEDEF_DECL and
-                         child.kind in STRUCTURED_DATA_KINDS and
-                         child.spelling)):
-                    decl = child.get_definition()
+        result = frozenset(Namespace._iter_all_assoc(cursor))
+        _ASSOC_CACHE[key] = (cursor, result)
 
-                    if decl is None:
-                        continue
+        if len(_ASSOC_CACHE) > _ASSOC_CACHE_SIZE:
+            _ASSOC_CACHE.popitem(last=False)
 
-                    spec = specialize(decl)
+        return result
 
-                    # Check to avoid parsing the same type multiple times.
-                    # Greatly reduces the time required
-                    if spec not in result:
-                        stack.append(decl)
-                        result.add(spec)
+    @staticmethod
+    def _iter_all_assoc(cursor: clang.cindex.Cursor) -> Generator[CCursor, None, None]:
+        """
+        Lazily yields the types `_get_all_assoc` collects,
+        each definition once.
 
-        return result
+        @param cursor: The declaration to inspect.
+        @return: Generator[CCursor]
+        """
+        # Definitions found. Cursors hash with clang_hashCursor and compare
+        # with clang_equalCursors, so colliding hashes are told apart.
+        found = set()
+        # Definitions already walked, reachable again through
+        # shared types
+        visited = set()
+        stack = [cursor]
+        pop = stack.pop
+        push = stack.append
+
+        while stack:
+            current = pop()
+
+            if current in visited:
+                continue
+
+            visited.add(current)
+
+            # The whole subtree is walked by libclang in one call
+            for child in current.collect_descendants(_references_type):
+                decl = child.get_definition()
+
+                # Check to avoid parsing the same type multiple times.
+                # Greatly reduces the time required
+                if decl is None or decl in found:
+                    continue
+
+                found.add(decl)
+                push(decl)
+                yield specialize(decl)
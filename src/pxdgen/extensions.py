@@ -18,6 +18,7 @@
 # Extensions to the Clang bindings that do not exist in the current version
 import clang.cindex
 from ctypes import c_bool
+from typing import Callable, List
 
 
 C = clang.cindex.conf.lib
@@ -31,6 +32,34 @@ def is_macro_function(self) -> bool:
     return C.clang_Cursor_isMacroFunctionLike(self)
 
 
+def collect_descendants(
+        self,
+        predicate: Callable[[clang.cindex.Cursor, clang.cindex.Cursor], bool]
+) -> List[clang.cindex.Cursor]:
+    """
+    Collects every descendant of this cursor accepted by the
+    predicate, in a single recursive clang_visitChildren call
+    instead of one get_children() visit per level.
+
+    @param predicate: Called with each descendant and its parent.
+    @return: The accepted descendants, in traversal order.
+    """
+    tu = self._tu
+
+    def visitor(child, parent, result):
+        # Cursors returned by the visitor need the translation unit
+        # for calls such as get_definition()
+        child._tu = tu
+        if predicate(child, parent):
+            result.append(child)
+        # CXChildVisit_Recurse
+        return 2
+
+    result = list()
+    C.clang_visitChildren(self, clang.cindex.callbacks["cursor_visit"](visitor), result)
+    return result
+
+
 def load_extensions():
     f = C.clang_Cursor_isInlineNamespace
     f.argtypes = [clang.cindex.Cursor]
@@ -41,3 +70,5 @@ def load_extensions():
     f.argtypes = [clang.cindex.Cursor]
     f.restype = c_bool
     setattr(clang.cindex.Cursor, "is_macro_function", is_macro_function)
+
+    setattr(clang.cindex.Cursor, "collect_descendants", collect_descendants)
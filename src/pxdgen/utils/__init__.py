@@ -16,3 +16,4 @@
 
 from .utils import *
 from .tab_writer import *
+from .cache import *
@@ -0,0 +1,58 @@
+#    PxdGen - A C/C++ header conversion tool
+#    Copyright (C) 2021  Eric Rowley
+
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import functools
+from typing import Any, Callable
+
+
+# Marks a value not computed yet, as None is a valid value
+_MISSING = object()
+
+
+class cached_property:
+    def __init__(self, func: Callable[[Any], Any]):
+        """
+        Property computed once per instance, for classes using
+        __slots__ that therefore cannot use functools.cached_property.
+        Values are kept in the `_cache` dict slot of the instance,
+        keyed by this descriptor, so an override calling its base
+        property through super() does not overwrite the base value.
+
+        @param func: Function computing the value of the property.
+        """
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __get__(self, instance: Any, owner: type = None) -> Any:
+        """
+        Get the cached value, computing it on first access.
+
+        @param instance: Instance the property is read from.
+        @param owner: Class the property is read from.
+        @return: The cached value.
+        """
+        if instance is None:
+            return self
+
+        cache = instance._cache
+        # Every property misses once per instance, so the miss
+        # is tested without raising KeyError
+        value = cache.get(self, _MISSING)
+
+        if value is _MISSING:
+            value = cache[self] = self.func(instance)
+
+        return value
@@ -15,6 +15,7 @@
 #    along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import io
+from typing import Iterable
 from ..constants import TAB
 
 
@@ -50,6 +51,17 @@ class TabWriter(io.StringIO):
         """
         return self.write(value + '\n')
 
+    def writeblock(self, lines: Iterable[str]) -> int:
+        """
+        Writes each line as `writeline` would, joined
+        into a single write to the internal buffer.
+
+        @param lines: The strings to write.
+        @return: Length of data written, including newline characters.
+        """
+        prefix = TAB * self.tabs
+        return super().write(''.join([f"{prefix}{line}\n" for line in lines]))
+
     def indent(self):
         """
         Indents future output.
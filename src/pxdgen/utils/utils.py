@@ -16,7 +16,7 @@
 
 import os.path
 import clang.cindex
-from typing import List, Dict, Tuple, Callable, Optional
+from typing import List, Dict, Tuple, Callable, Optional, Iterable
 from ..constants import *
 
 
@@ -37,11 +37,7 @@ def find_namespaces(cursor: clang.cindex.Cursor, valid_headers: set, recursive:
 
     def _update(d1, d2):
         for key in d2:
-            ns_list = d1.get(key)
-            if ns_list is None:
-                ns_list = list()
-                d1[key] = ns_list
-            ns_list += d2[key]
+            d1.setdefault(key, list()).extend(d2[key])
 
     ret = dict()
     namespaces = list()
@@ -51,10 +47,11 @@ def find_namespaces(cursor: clang.cindex.Cursor, valid_headers: set, recursive:
     for child in cursor.get_children():
         if child.location.file is None:
             continue
-        add_cond = all((
-            child.kind == clang.cindex.CursorKind.NAMESPACE or is_cppclass(child),
-            recursive or os.path.abspath(child.location.file.name) in valid_headers
-        ))
+        # The file test is cheaper than walking the children of a class
+        add_cond = (
+            (recursive or abspath(child.location.file.name) in valid_headers) and
+            (child.kind == clang.cindex.CursorKind.NAMESPACE or is_cppclass(child))
+        )
         if add_cond:
             namespaces.append(child)
 
@@ -91,6 +88,36 @@ def containing_space(cursor: clang.cindex.Cursor, pred: Callable) -> str:
     return "::".join(parts)
 
 
+def _is_location_space(parent: clang.cindex.Cursor) -> bool:
+    """
+    Whether a parent is part of the location of its descendants.
+
+    @param parent: The parent cursor.
+    @return: Boolean.
+    """
+    return parent.kind in SPACE_KINDS and not parent.is_inline_namespace()
+
+
+def _is_namespace_space(parent: clang.cindex.Cursor) -> bool:
+    """
+    Whether a parent is part of the namespace of its descendants.
+
+    @param parent: The parent cursor.
+    @return: Boolean.
+    """
+    return parent.kind == clang.cindex.CursorKind.NAMESPACE and not parent.is_inline_namespace()
+
+
+def _is_local_space(parent: clang.cindex.Cursor) -> bool:
+    """
+    Whether a parent is part of the local access of its descendants.
+
+    @param parent: The parent cursor.
+    @return: Boolean.
+    """
+    return parent.kind != clang.cindex.CursorKind.NAMESPACE
+
+
 def get_cursor_location(cursor: clang.cindex.Cursor) -> str:
     """
     Returns the fully qualified C++ location of a cursor.
@@ -100,7 +127,7 @@ def get_cursor_location(cursor: clang.cindex.Cursor) -> str:
     @param cursor: The cursor to locate.
     @return: Fully qualified C++ location as a string.
     """
-    return containing_space(cursor, lambda parent: parent.kind in SPACE_KINDS and not parent.is_inline_namespace())
+    return containing_space(cursor, _is_location_space)
 
 
 def get_cursor_namespace(cursor: clang.cindex.Cursor) -> str:
@@ -113,7 +140,7 @@ def get_cursor_namespace(cursor: clang.cindex.Cursor) -> str:
     @param cursor: The cursor to locate.
     @return: C++ namespace of the cursor.
     """
-    return containing_space(cursor, lambda parent: parent.kind == clang.cindex.CursorKind.NAMESPACE and not parent.is_inline_namespace())
+    return containing_space(cursor, _is_namespace_space)
 
 
 def get_cursor_local_access(cursor: clang.cindex.Cursor) -> str:
@@ -127,28 +154,57 @@ def get_cursor_local_access(cursor: clang.cindex.Cursor) -> str:
     @param cursor: The cursor to access.
     @return: C++ access string.
     """
-    return containing_space(cursor, lambda parent: parent.kind != clang.cindex.CursorKind.NAMESPACE)
+    return containing_space(cursor, _is_local_space)
+
+
+def get_cursor_spaces(cursor: clang.cindex.Cursor) -> Tuple[str, str, str]:
+    """
+    The results of get_cursor_location, get_cursor_namespace
+    and get_cursor_local_access, built from a single walk up
+    the tree of a cursor.
+
+    @param cursor: The cursor to locate.
+    @return: Tuple of location, namespace and local access strings.
+    """
+    location, namespace, local = list(), list(), list()
+    parent = cursor.lexical_parent
+
+    while parent is not None:
+        spelling = parent.spelling
+
+        if _is_location_space(parent):
+            location.append(spelling)
+        if _is_namespace_space(parent):
+            namespace.append(spelling)
+        if _is_local_space(parent):
+            local.append(spelling)
+
+        parent = parent.lexical_parent
+
+    location.reverse()
+    namespace.reverse()
+    local.reverse()
+
+    return "::".join(location), "::".join(namespace), "::".join(local)
 
 
-def is_cppclass(cursor: clang.cindex.Cursor) -> bool:
+def is_cppclass(cursor: clang.cindex.Cursor, children: Optional[Iterable[clang.cindex.Cursor]] = None) -> bool:
     """
     Given a cursor to a struct/class/class template, returns whether the cursor
     is a C++ class type.
 
     @param cursor: Clang Cursor.
+    @param children: The children of the cursor, if already collected.
     @return: Boolean.
     """
     # Handle trivial cases where Clang does the heavy lifting
     if cursor.kind not in STRUCTURED_DATA_KINDS:
         return False
-    if cursor.kind in (
-            clang.cindex.CursorKind.CLASS_DECL,
-            clang.cindex.CursorKind.CLASS_TEMPLATE
-    ):
+    if cursor.kind in CLASS_KINDS:
         return True
 
     # C++ struct decl that is not C-compliant
-    for child in cursor.get_children():
+    for child in cursor.get_children() if children is None else children:
         # C allows fields
         if child.kind == clang.cindex.CursorKind.FIELD_DECL:
             continue
@@ -182,12 +238,8 @@ def is_constructor(cursor: clang.cindex.Cursor) -> bool:
             if container is None:
                 return False
 
-            func_name = cursor.spelling
-
-            try:
-                func_name = func_name[:func_name.index("<")].strip()
-            except ValueError:
-                pass
+            # Templated constructors are spelled like Foo<T>
+            func_name = cursor.spelling.partition('<')[0].rstrip()
 
             if func_name == container.spelling:
                 return True
@@ -213,8 +265,11 @@ def is_extra_decl(cursor: clang.cindex.Cursor) -> bool:
     @param cursor: Clang cursor.
     @return: bool.
     """
+    if cursor.kind not in ANON_KINDS:
+        return False
+
     d = cursor.get_definition()
-    return cursor.kind in ANON_KINDS and d is not None and d != cursor
+    return d is not None and d != cursor
 
 
 def is_anonymous(cursor: clang.cindex.Cursor) -> bool:
@@ -237,7 +292,7 @@ def is_typename_unsupported(t: clang.cindex.Type) -> bool:
     @return: bool.
     """
     ut, _ = get_underlying_type(t)
-    return ut.spelling.startswith("typename ") or re.match(RE_DECLTYPE, ut.spelling) or any(
+    return ut.spelling.startswith("typename ") or RE_DECLTYPE.match(ut.spelling) or any(
         is_typename_unsupported(ut.get_template_argument_type(i)) for i in range(ut.get_num_template_arguments())
     )
 
@@ -328,18 +383,19 @@ def is_function_variadic(cursor: clang.cindex.Cursor) -> bool:
         return False
 
 
-def get_template_params(cursor: clang.cindex.Cursor) -> str:
+def get_template_params(cursor: clang.cindex.Cursor, children: Optional[Iterable[clang.cindex.Cursor]] = None) -> str:
     """
     Returns the Cython string representing template parameters
     of a Cursor.
 
     @param cursor: Any Cursor.
+    @param children: The children of the cursor, if already collected.
     @return: Cython template string, like "[T, U]".
     """
 
     typenames = list()
 
-    for c in cursor.get_children():
+    for c in cursor.get_children() if children is None else children:
         if c.kind in TEMPLATE_KINDS and c.spelling:
             typenames.append(c.spelling)
 
@@ -360,6 +416,60 @@ def get_template_params_as_list(cursor: clang.cindex.Cursor) -> List[str]:
     return [c.spelling for c in cursor.get_children() if c.kind in TEMPLATE_KINDS and c.spelling]
 
 
+# Absolute paths of the file names reported by Clang
+_ABSOLUTE_PATHS: Dict[str, str] = dict()
+
+
+def abspath(path: str) -> str:
+    """
+    Memoized os.path.abspath, as cursors from the same
+    file all report the same file name.
+
+    @param path: A file name reported by Clang.
+    @return: The absolute path.
+    """
+    result = _ABSOLUTE_PATHS.get(path)
+
+    if result is None:
+        result = _ABSOLUTE_PATHS[path] = os.path.abspath(path)
+
+    return result
+
+
+# Identifiers derived from C++ addresses, which recur for every reference
+_SANITIZED_ADDRESSES: Dict[str, str] = dict()
+
+
+def sanitize_address(address: str) -> str:
+    """
+    Converts a fully qualified C++ name into an identifier
+    usable as a Cython alias.
+    Ex: std::vector -> std_vector
+
+    @param address: Fully qualified C++ name.
+    @return: Identifier string.
+    """
+    result = _SANITIZED_ADDRESSES.get(address)
+
+    if result is None:
+        result = _SANITIZED_ADDRESSES[address] = address.replace("::", '_')
+
+    return result
+
+
+def get_address(location: str, name: str) -> str:
+    """
+    Joins a C++ location and a name into a fully qualified
+    name, without a separator when either one is empty.
+    Ex: ("Foo::Bar", "Baz") -> Foo::Bar::Baz
+
+    @param location: Fully qualified C++ location.
+    @param name: Unqualified C++ name.
+    @return: Fully qualified C++ name.
+    """
+    return f"{location}::{name}" if location and name else location or name
+
+
 def get_relative_type_name(importer: clang.cindex.Cursor, importee: clang.cindex.Cursor) -> str:
     """
     How an imported type name appears with respect to another type.
@@ -368,45 +478,45 @@ def get_relative_type_name(importer: clang.cindex.Cursor, importee: clang.cindex
     @param importee: The imported type declaration.
     @return: The string following Cython syntax.
     """
-    # Absolute location of importer
-    importer_location = get_cursor_location(importer)
-    # Absolute location of type being imported
-    importee_location = get_cursor_location(importee)
-    # Fully qualified C++ name of type being imported
-    importee_addr = f"{importee_location}::{importee.spelling}".strip("::")
+    # Absolute location and namespace of importer
+    importer_location, importer_namespace, _ = get_cursor_spaces(importer)
+    # Absolute location, namespace and local access of type being imported
+    importee_location, importee_namespace, importee_local = get_cursor_spaces(importee)
+    # Unqualified and fully qualified C++ names of type being imported
+    importee_name = importee.spelling
+    importee_addr = get_address(importee_location, importee_name)
 
     # If the location is equal, the imported type can be referred to directly
     # If ignored, just return
     if importer_location == importee_location or importee_addr in IGNORED_IMPORTS:
-        return importee.spelling
+        return importee_name
     # Convenient replacements for special types
-    if importee_addr in REPLACED_IMPORTS:
-        return REPLACED_IMPORTS[importee_addr]
+    replacement = REPLACED_IMPORTS.get(importee_addr)
+    if replacement is not None:
+        return replacement
     # Special handling of libc/libcpp imports that are already defined
     if importee_addr in STD_IMPORTS:
-        return importee_addr.replace("::", '_')
+        return sanitize_address(importee_addr)
     # Top-level namespace, do not process further
     if not importee_location:
-        return importee.spelling
+        return importee_name
 
     # The containing namespace, not including classes or other spaces
     # In the pxd output, this resolves to a specific file
-    importer_namespace = get_cursor_namespace(importer)
-    importee_namespace = get_cursor_namespace(importee)
-    importee_dot = get_cursor_local_access(importee).split("::")[1:]
-    importee_dot.append(importee.spelling)
+    importee_dot = importee_local.split("::")[1:]
+    importee_dot.append(importee_name)
 
     # If in the same namespace, we have to access directly or by the containing class
     if importer_namespace == importee_namespace:
         # Not in a class, access directly
         if importee_namespace == importee_location:
-            return importee.spelling
+            return importee_name
         # Create the spelling of class-access
         return '.'.join(importee_dot)
     # Not in the same namespace, use the full reference
     else:
         return (
-            importee_namespace.replace("::", '_') +
+            sanitize_address(importee_namespace) +
             '_' + '.'.join(importee_dot)
         )
 
@@ -425,16 +535,16 @@ def get_import_string(importer: clang.cindex.Cursor, importee: clang.cindex.Curs
     @return: The import string following Cython syntax.
     """
     importer_namespace = get_cursor_namespace(importer)
-    importee_namespace = get_cursor_namespace(importee)
-    importee_location = get_cursor_location(importee)
-    importee_addr = f"{importee_location}::{importee.spelling}".strip("::")
+    importee_location, importee_namespace, importee_local = get_cursor_spaces(importee)
+    importee_name = importee.spelling
+    importee_addr = get_address(importee_location, importee_name)
 
     # Ignored imports are builtin
-    if importee_addr in IGNORED_IMPORTS or importee_addr in REPLACED_IMPORTS:
+    if importee_addr in UNDECLARED_IMPORTS:
         return None
 
-    importee_dot = get_cursor_local_access(importee).split("::")[1:]
-    importee_dot.append(importee.spelling)
+    importee_dot = importee_local.split("::")[1:]
+    importee_dot.append(importee_name)
 
     # If in the same namespace, these are potentially in the same
     # file, in which case no import is required.
@@ -469,7 +579,7 @@ def get_import_string(importer: clang.cindex.Cursor, importee: clang.cindex.Curs
     return "from {} cimport {} as {}".format(
         importee_namespace.replace('::', '.'),
         importee_dot[0],
-        importee_namespace.replace('::', '_') + '_' + importee_dot[0]
+        sanitize_address(importee_namespace) + '_' + importee_dot[0]
     )
 
 
@@ -486,17 +596,6 @@ def full_type_repr(ctype: clang.cindex.Type, ref_cursor: clang.cindex.Cursor) ->
     Case foo::bar, where ref_cursor == foo
     Returns: bar
     """
-    expandable = (
-        clang.cindex.TypeKind.ELABORATED,
-        clang.cindex.TypeKind.UNEXPOSED
-    )
-
-    expandable_cursors = (
-        clang.cindex.CursorKind.CLASS_DECL,
-        clang.cindex.CursorKind.CLASS_TEMPLATE,
-        clang.cindex.CursorKind.STRUCT_DECL
-    )
-
     def finalize(subtype: clang.cindex.Type):
         if subtype.spelling in ("bool", "_Bool"):
             return "bint"
@@ -511,28 +610,30 @@ def full_type_repr(ctype: clang.cindex.Type, ref_cursor: clang.cindex.Cursor) ->
 
         return get_relative_type_name(ref_cursor, decl)
 
-    if is_function_pointer(ctype):
-        ndim, _ = walk_pointer(ctype)
-        result = get_function_pointer_return_type(ctype)
-        args = get_function_pointer_arg_types(ctype)
-        return f"{full_type_repr(result, ref_cursor)} ({'*' * ndim})({', '.join(full_type_repr(a, ref_cursor) for a in args)})"
-    elif ctype.kind == clang.cindex.TypeKind.POINTER:
-        ndim, ctype = walk_pointer(ctype)
-        return full_type_repr(ctype, ref_cursor) + '*' * ndim
-    elif ctype.kind == clang.cindex.TypeKind.LVALUEREFERENCE:
+    # The pointer chain is walked once, and each kind read once
+    ndim, pointee = walk_pointer(ctype)
+    kind = pointee.kind
+
+    if kind == clang.cindex.TypeKind.FUNCTIONPROTO:
+        result = full_type_repr(pointee.get_result(), ref_cursor)
+        args = ', '.join([full_type_repr(a, ref_cursor) for a in pointee.argument_types()])
+        return f"{result} ({'*' * ndim})({args})"
+    elif ndim:
+        return full_type_repr(pointee, ref_cursor) + '*' * ndim
+    elif kind == clang.cindex.TypeKind.LVALUEREFERENCE:
         return full_type_repr(ctype.get_pointee(), ref_cursor) + '&'
-    elif ctype.kind == clang.cindex.TypeKind.RVALUEREFERENCE:
+    elif kind == clang.cindex.TypeKind.RVALUEREFERENCE:
         return full_type_repr(ctype.get_pointee(), ref_cursor) + "&&"
-    elif ctype.kind == clang.cindex.TypeKind.CONSTANTARRAY:
+    elif kind == clang.cindex.TypeKind.CONSTANTARRAY:
         return full_type_repr(ctype.get_array_element_type(), ref_cursor) + f"[{ctype.get_array_size()}]"
-    elif ctype.kind in (clang.cindex.TypeKind.INCOMPLETEARRAY, clang.cindex.TypeKind.VARIABLEARRAY):
+    elif kind in VARIABLE_ARRAY_KINDS:
         return full_type_repr(ctype.get_array_element_type(), ref_cursor) + "[]"
 
     nargs = ctype.get_num_template_arguments()
 
     if (
-        ctype.kind not in expandable or
-        ctype.get_declaration().kind not in expandable_cursors or
+        kind not in EXPANDABLE_TYPE_KINDS or
+        ctype.get_declaration().kind not in STRUCTURED_DATA_KINDS or
         nargs <= 0
     ):
         return finalize(ctype)
@@ -599,7 +700,7 @@ def get_underlying_type(ctype: clang.cindex.Type) -> Tuple[clang.cindex.Type, st
     elif ctype.kind == clang.cindex.TypeKind.RVALUEREFERENCE:
         t, tok = get_underlying_type(ctype.get_pointee())
         return t, tok + "&&"
-    elif ctype.kind in (clang.cindex.TypeKind.INCOMPLETEARRAY, clang.cindex.TypeKind.VARIABLEARRAY):
+    elif ctype.kind in VARIABLE_ARRAY_KINDS:
         t, tok = get_underlying_type(ctype.get_array_element_type())
         return t, tok + "[]"
     elif ctype.kind == clang.cindex.TypeKind.CONSTANTARRAY:
@@ -610,11 +711,7 @@ def get_underlying_type(ctype: clang.cindex.Type) -> Tuple[clang.cindex.Type, st
             ctype = ctype.get_array_element_type()
 
         parts.reverse()
-        token = ''
-
-        for t in parts:
-            token += f"[{t}]"
-
+        token = ''.join(f"[{t}]" for t in parts)
         ctype, tok = get_underlying_type(ctype)
 
         return ctype, tok + token
@@ -678,6 +775,10 @@ def strip_beg_type_ids(s: str) -> str:
     return s
 
 
+# Cython spellings of C++ type strings, which recur for every use of a type
+_CONVERTED_DIALECTS: Dict[str, str] = dict()
+
+
 def convert_dialect(s: str) -> str:
     """
     Converts C++ dialect string to Cython dialect
@@ -687,6 +788,18 @@ def convert_dialect(s: str) -> str:
     @param s: String to convert
     @return: Converted string
     """
+    ret = _CONVERTED_DIALECTS.get(s)
+
+    if ret is None:
+        ret = _CONVERTED_DIALECTS[s] = _convert_dialect(s)
+
+    return ret
+
+
+def _convert_dialect(s: str) -> str:
+    """
+    Uncached conversion done by `convert_dialect`.
+    """
     throws = "throw("
 
     # First templates